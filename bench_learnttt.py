@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+#
+"""Learning curve benchmarks: measure how many games a learner player
+   needs to reach a target draw rate against a minimax player.
+     - preseed:    starting from an empty value table or from a
+                   pre-seeded one
+     - curriculum: training against each fixed opponent type or
+                   following an opponent schedule
+     - learning:   learning only from defeats or from every outcome
+                   with TD(lambda), also measuring the per game cost
+                   of the end of game update"""
+
+from argparse import ArgumentParser
+
+import time
+
+from jokettt.board import Board
+from jokettt.learnerplayer import LearnerPlayer
+from jokettt.minimaxplayer import MinimaxPlayer
+
+from gametree import build_preseed_values
+from learnttt import (LEARNER_PIECE, OPPONENT_PIECE, DEFAULT_ALPHA_VALUE, DEFAULT_EPS_VALUE,
+                      OPPONENT_TYPES, build_random_ztable_initdata, build_opponent,
+                      select_opponent_type, play_ai_vs_ai_game, lookahead_depth,
+                      schedule_file)
+from tdlearning import DEFAULT_LAMBDA_VALUE, TDLambdaTrainer, lambda_value
+
+DEFAULT_SCHEDULE = [(1000, {"random": 1.0}),
+                    (1000, {"random": 0.2, "self": 0.8}),
+                    (0, {"random": 0.1, "self": 0.2, "minimax": 0.7})]
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+class TimedLearnerPlayer(LearnerPlayer):
+    """A LearnerPlayer that measures the time spent learning from defeats"""
+    update_seconds = 0.0
+
+    def learn_from_defeat(self, board):
+        start = time.perf_counter()
+        LearnerPlayer.learn_from_defeat(self, board)
+        self.update_seconds += time.perf_counter() - start
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+class TimedTDLambdaTrainer(TDLambdaTrainer):
+    """A TDLambdaTrainer that measures the time spent learning from outcomes"""
+    update_seconds = 0.0
+
+    def learn_from_outcome(self, board):
+        start = time.perf_counter()
+        TDLambdaTrainer.learn_from_outcome(self, board)
+        self.update_seconds += time.perf_counter() - start
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def games_to_target(init_ztable, init_values, target, window, max_games, td_lambda=None):
+    """Train a learner against a minimax player until the draw rate
+       over the last 'window' statistic games reaches 'target'. The
+       learner learns from every outcome with TD(lambda) if td_lambda
+       is given, otherwise only from defeats.
+       Returns the number of games played (max_games if not reached)
+       and the seconds spent in the end of game updates"""
+    board = Board(LEARNER_PIECE, OPPONENT_PIECE, init_ztable)
+    learner = TimedLearnerPlayer(LEARNER_PIECE, board, init_values,
+                                 DEFAULT_ALPHA_VALUE, DEFAULT_EPS_VALUE, 0)
+    opponent = MinimaxPlayer(OPPONENT_PIECE)
+    td_trainers = {}
+    if td_lambda is not None:
+        td_trainers[learner] = TimedTDLambdaTrainer(learner, DEFAULT_ALPHA_VALUE, td_lambda)
+
+    last_results = []
+    player_a_turn = True
+    num_games = max_games
+    for num_game in range(1, max_games + 1):
+        res, expl_move_done = play_ai_vs_ai_game(learner, opponent, board, player_a_turn, 0,
+                                                 td_trainers)
+        if not expl_move_done:
+            last_results.append(res == 0)
+            if len(last_results) > window:
+                last_results.pop(0)
+            if len(last_results) == window and sum(last_results) / window >= target:
+                num_games = num_game
+                break
+        player_a_turn = not player_a_turn
+        board.reset()
+
+    update_seconds = learner.update_seconds
+    for trainer in td_trainers.values():
+        update_seconds += trainer.update_seconds
+    return num_games, update_seconds
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def evaluate_draw_rate(init_ztable, values, num_games):
+    """Play 'num_games' games against a minimax player with a greedy
+       copy of the learner, that does not touch the given values.
+       Returns the draw rate"""
+    board = Board(LEARNER_PIECE, OPPONENT_PIECE, init_ztable)
+    learner = LearnerPlayer(LEARNER_PIECE, board, dict(values), DEFAULT_ALPHA_VALUE, 0.0, 0)
+    opponent = MinimaxPlayer(OPPONENT_PIECE)
+    draws = 0
+    for num_game in range(num_games):
+        board.reset()
+        res, _ = play_ai_vs_ai_game(learner, opponent, board, num_game % 2 == 0, 0)
+        if res == 0:
+            draws += 1
+    return draws / num_games
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def games_to_convergence(schedule, target, eval_every, eval_games, max_games):
+    """Train a learner against the opponents chosen by 'schedule'
+       until its greedy policy reaches the 'target' draw rate against
+       a minimax player, evaluated every 'eval_every' games.
+       Returns the number of training games played (max_games if
+       not reached)"""
+    init_ztable = build_random_ztable_initdata()
+    board = Board(LEARNER_PIECE, OPPONENT_PIECE, init_ztable)
+    learner = LearnerPlayer(LEARNER_PIECE, board, {},
+                            DEFAULT_ALPHA_VALUE, DEFAULT_EPS_VALUE, 0)
+    opponents = {}
+    player_a_turn = True
+    for num_games in range(1, max_games + 1):
+        opponenttype = select_opponent_type(schedule, num_games - 1)
+        if opponenttype not in opponents:
+            opponents[opponenttype] = build_opponent(opponenttype, board,
+                                                     DEFAULT_ALPHA_VALUE, DEFAULT_EPS_VALUE, 0,
+                                                     learner)
+        play_ai_vs_ai_game(learner, opponents[opponenttype], board, player_a_turn, 0)
+        player_a_turn = not player_a_turn
+        board.reset()
+        if num_games % eval_every == 0 and \
+           evaluate_draw_rate(init_ztable, learner.values, eval_games) >= target:
+            return num_games
+    return max_games
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def preseed_benchmark(args):
+    """Compare an empty value table with pre-seeded ones"""
+    configurations = [("empty", None), ("terminal", 0), ("lookahead", args.preseed_depth)]
+    print("configuration,run,games,preseed_seconds")
+    averages = {}
+    for name, depth in configurations:
+        total_games = 0
+        for run in range(args.runs):
+            init_ztable = build_random_ztable_initdata()
+            start = time.perf_counter()
+            if depth is None:
+                init_values = {}
+            else:
+                init_values = build_preseed_values(init_ztable, depth=depth)
+            preseed_time = time.perf_counter() - start
+            num_games, _ = games_to_target(init_ztable, init_values,
+                                           args.target, args.window, args.max_games)
+            total_games += num_games
+            print(f"{name},{run},{num_games},{preseed_time:.3f}")
+        averages[name] = total_games / args.runs
+
+    print(f"# games to reach {args.target:.2f} draw rate (average over {args.runs} runs)")
+    for name, _ in configurations:
+        print(f"#   {name:10s}: {averages[name]:8.1f}"
+              f" ({averages['empty'] - averages[name]:+.1f} games saved)")
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def curriculum_benchmark(args):
+    """Compare each fixed opponent type with an opponent schedule"""
+    configurations = [(opponenttype, [(0, {opponenttype: 1.0})])
+                      for opponenttype in OPPONENT_TYPES]
+    configurations.append(("schedule", args.schedule or DEFAULT_SCHEDULE))
+    print("configuration,run,games")
+    averages = {}
+    for name, schedule in configurations:
+        total_games = 0
+        for run in range(args.runs):
+            num_games = games_to_convergence(schedule, args.target, args.eval_every,
+                                             args.eval_games, args.max_games)
+            total_games += num_games
+            print(f"{name},{run},{num_games}")
+        averages[name] = total_games / args.runs
+
+    print(f"# games to reach {args.target:.2f} greedy draw rate vs minimax"
+          f" (average over {args.runs} runs)")
+    for name, _ in configurations:
+        print(f"#   {name:10s}: {averages[name]:8.1f}")
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def learning_benchmark(args):
+    """Compare learning only from defeats with TD(lambda) learning
+       from every outcome"""
+    configurations = [("defeat", None), ("td", args.td_lambda)]
+    print("configuration,run,games,update_us_per_game")
+    averages = {}
+    for name, td_lambda in configurations:
+        total_games = 0
+        total_seconds = 0.0
+        for run in range(args.runs):
+            num_games, update_seconds = games_to_target(build_random_ztable_initdata(), {},
+                                                        args.target, args.window,
+                                                        args.max_games, td_lambda)
+            total_games += num_games
+            total_seconds += update_seconds
+            print(f"{name},{run},{num_games},{1e6 * update_seconds / num_games:.2f}")
+        averages[name] = (total_games / args.runs, 1e6 * total_seconds / total_games)
+
+    print(f"# games to reach {args.target:.2f} draw rate and end of game update cost"
+          f" (average over {args.runs} runs)")
+    for name, _ in configurations:
+        print(f"#   {name:10s}: {averages[name][0]:8.1f} games, {averages[name][1]:6.2f} us/game")
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+#   ***  MAIN ***
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def main():
+    """Main program: parses options and runs the selected benchmark"""
+
+    parser = ArgumentParser()
+    parser.add_argument("benchmark", choices=["preseed", "curriculum", "learning"], nargs='?',
+                        default="preseed", help="the benchmark to run")
+    parser.add_argument("-r", "--runs", type=int, default=5,
+                        help="number of training runs for each configuration")
+    parser.add_argument("--target", type=float, default=0.95,
+                        help="target draw rate")
+    parser.add_argument("--window", type=int, default=100,
+                        help="number of games used to compute the draw rate "
+                             "(only preseed and learning)")
+    parser.add_argument("--max_games", type=int, default=20000,
+                        help="maximum number of games for each run")
+    parser.add_argument("--preseed_depth", type=lookahead_depth, default=2,
+                        help="lookahead depth used for the 'lookahead' configuration")
+    parser.add_argument("--eval_every", type=int, default=100,
+                        help="number of training games between evaluations (only curriculum)")
+    parser.add_argument("--eval_games", type=int, default=20,
+                        help="number of games of each evaluation (only curriculum)")
+    parser.add_argument("--schedule", type=schedule_file,
+                        help="opponent schedule file to compare with the fixed opponents "
+                             "(only curriculum)")
+    parser.add_argument("--lambda", dest="td_lambda", type=lambda_value,
+                        default=DEFAULT_LAMBDA_VALUE,
+                        help="lambda parameter of TD(lambda) learning (only learning)")
+    args = parser.parse_args()
+
+    if args.benchmark == "preseed":
+        preseed_benchmark(args)
+    elif args.benchmark == "curriculum":
+        curriculum_benchmark(args)
+    else:
+        learning_benchmark(args)
+
+
+# --------------------------------------------------------------------
+if __name__ == "__main__":
+    main()
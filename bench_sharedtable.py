@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+#
+"""Shared value table benchmark: compare the time to get the learned
+   data and the per-process memory overhead when every process loads
+   its own copy from a file and when all the processes attach to the
+   same shared memory segment"""
+
+from argparse import ArgumentParser, SUPPRESS
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from gametree import build_preseed_values
+from sharedtable import SharedValueTable, table_size, DEFAULT_CAPACITY
+
+SHARED_TABLE_NAME = "jokettt_bench"
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def build_random_ztable_initdata():
+    """Builds a random Zobrist table, as jokettt Board does"""
+    return np.random.randint(0, sys.maxsize, size=(3, 3, 2), dtype=np.int64)
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def worker(mode, source):
+    """Gets the learned data as a player process does, reads every
+       value once and prints elapsed seconds and allocated bytes"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "private":
+        init_data = np.load(source, allow_pickle=True)
+        values = init_data['value_tuple'].item()
+    else:
+        values = SharedValueTable(source)
+    elapsed = time.perf_counter() - start
+    checksum = sum(values[zhash] for zhash in values)
+    allocated = tracemalloc.get_traced_memory()[0]
+    print(f"{elapsed:.6f},{allocated},{checksum:.1f}")
+    if mode == "shared":
+        values.close()
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def run_workers(mode, source, num_processes):
+    """Runs the workers as separate processes, one at a time.
+       Returns the list of (seconds, bytes) they reported"""
+    results = []
+    for _ in range(num_processes):
+        output = subprocess.run([sys.executable, __file__, "--worker", mode, source],
+                                check=True, capture_output=True, text=True).stdout
+        elapsed, allocated, _ = output.strip().split(",")
+        results.append((float(elapsed), int(allocated)))
+    return results
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+#   ***  MAIN ***
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def main():
+    """Main program: builds a fully populated value table and measures
+        the workers in both modes"""
+
+    parser = ArgumentParser()
+    parser.add_argument("-p", "--processes", type=int, default=5,
+                        help="number of processes for each mode")
+    parser.add_argument("--worker", nargs=2, metavar=("MODE", "SOURCE"),
+                        help=SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(*args.worker)
+        return
+
+    init_ztable = build_random_ztable_initdata()
+    init_values = build_preseed_values(init_ztable, depth=9)
+    print(f"# value table with {len(init_values)} positions")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        datafile = os.path.join(tmpdir, "learned.npz")
+        np.savez(datafile, zobrist_hash = init_ztable, value_tuple = init_values)
+        private = run_workers("private", datafile, args.processes)
+
+    shared_table = SharedValueTable(SHARED_TABLE_NAME, init_ztable, init_values)
+    try:
+        shared = run_workers("shared", SHARED_TABLE_NAME, args.processes)
+    finally:
+        shared_table.close()
+
+    print("mode,process,seconds,bytes")
+    for mode, results in (("private", private), ("shared", shared)):
+        for process, (elapsed, allocated) in enumerate(results):
+            print(f"{mode},{process},{elapsed:.6f},{allocated}")
+
+    for mode, results in (("private", private), ("shared", shared)):
+        print(f"# {mode:8s}: {1000 * sum(r[0] for r in results) / len(results):8.3f} ms to get"
+              f" the data, {sum(r[1] for r in results) / len(results) / 1024:8.1f} KiB per process")
+    print(f"# shared segment: {table_size(DEFAULT_CAPACITY) / 1024:.1f} KiB for all the processes")
+
+
+# --------------------------------------------------------------------
+if __name__ == "__main__":
+    main()
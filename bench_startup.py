@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+#
+"""Startup benchmark: measure the time from the launch of the
+   interactive programs to their first board prompt, loading the
+   learned data from a .npz file or from a prepared model"""
+
+from argparse import ArgumentParser
+
+import os
+import select
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from gametree import build_preseed_values
+from sharedtable import save_value_table
+
+PROMPT = b"Move? "
+HELP = b"usage:"
+TIMEOUT = 30.0
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def time_to_output(command, expected):
+    """Launch the command and returns the seconds elapsed until the
+       expected bytes are printed on its standard output"""
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, env=env)
+    output = b""
+    try:
+        while expected not in output:
+            if time.perf_counter() - start > TIMEOUT:
+                raise RuntimeError("%s did not print %r" % (" ".join(command), expected))
+            ready, _, _ = select.select([process.stdout], [], [], TIMEOUT)
+            chunk = os.read(process.stdout.fileno(), 4096) if ready else b""
+            if not chunk and process.poll() is not None:
+                raise RuntimeError("%s exited before printing %r" % (" ".join(command), expected))
+            output += chunk
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+#   ***  MAIN ***
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def main():
+    """Main program: prepares the learned data files and measures each
+        program configuration"""
+
+    parser = ArgumentParser()
+    parser.add_argument("-r", "--runs", type=int, default=5,
+                        help="number of launches for each configuration")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    play = [sys.executable, os.path.join(here, "play.py")]
+    play_vs_learner = [sys.executable, os.path.join(here, "play_vs_learner.py")]
+    learnttt = [sys.executable, os.path.join(here, "learnttt.py")]
+
+    # a value table as large as a fully trained one
+    init_ztable = np.random.randint(0, sys.maxsize, size=(3, 3, 2), dtype=np.int64)
+    init_values = build_preseed_values(init_ztable, depth=9)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        datafile = os.path.join(tmpdir, "learned.npz")
+        modelfile = os.path.join(tmpdir, "learned.tttv")
+        np.savez(datafile, zobrist_hash = init_ztable, value_tuple = init_values)
+        save_value_table(modelfile, init_ztable, init_values)
+
+        configurations = [
+            ("play.py minimax", play + ["minimax"], PROMPT),
+            ("play.py learner", play + ["learner"], PROMPT),
+            ("play_vs_learner.py -l .npz", play_vs_learner + ["-l", datafile], PROMPT),
+            ("play_vs_learner.py -l model", play_vs_learner + ["-l", modelfile], PROMPT),
+            ("play.py --help", play + ["--help"], HELP),
+            ("play_vs_learner.py --help", play_vs_learner + ["--help"], HELP),
+            ("learnttt.py --help", learnttt + ["--help"], HELP),
+        ]
+
+        print(f"# {len(init_values)} positions in the learned data")
+        print("configuration,best_ms,average_ms")
+        for name, command, expected in configurations:
+            try:
+                times = [time_to_output(command, expected) for _ in range(args.runs)]
+            except RuntimeError as error:
+                print(f"{name},failed,failed  # {error}")
+                continue
+            print(f"{name},{1000 * min(times):.1f},{1000 * sum(times) / len(times):.1f}")
+
+
+# --------------------------------------------------------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+#
+"""Exact evaluation of the policy of a learner player. Loads the
+   learned data saved by learnttt.py and compares, in every reachable
+   position where the learner has to move, the greedy choice of the
+   learner with the game-theoretic optimal moves"""
+
+from argparse import ArgumentParser, ArgumentTypeError
+
+import os
+import time
+
+import numpy as np
+
+from gametree import (FIRST_PIECE_CELL, SECOND_PIECE_CELL, EMPTY_CELL,
+                      WIN_VALUE, UNKNOWN_VALUE, reachable_positions, terminal_value,
+                      position_value, children, other_cell, zobrist_hash)
+from sharedtable import is_value_table_file, load_value_table
+
+CELL_TO_PIECE = {EMPTY_CELL: '_', FIRST_PIECE_CELL: 'x', SECOND_PIECE_CELL: 'o'}
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def file_to_load(_x):
+    """Definition of argument type for learner init data,
+       a string with a pathname of a file. The file shall exist"""
+
+    if not os.path.exists(_x):
+        raise ArgumentTypeError("%s does not exist" % (_x,))
+    if not os.path.isfile(_x):
+        raise ArgumentTypeError("%s is not a file" % (_x,))
+    return _x
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def move_to_movestring(ndx):
+    """Convert a cell index in the <row><col> string format (e.g. "A1")"""
+    return "ABC"[ndx // 3] + "123"[ndx % 3]
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def position_to_string(cells):
+    """Compact representation of a position, one row after the other"""
+    return "/".join("".join(CELL_TO_PIECE[cell] for cell in cells[row:row + 3])
+                    for row in (0, 3, 6))
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def greedy_moves(cells, me, values, ztable):
+    """Returns the moves the learner considers best in the position,
+       as (move index, position after the move) pairs: a winning move
+       is valued 1.0, a position never seen is valued 0.5"""
+    best_value = None
+    best_moves = []
+    for move, child in children(cells, me):
+        if terminal_value(child, me) == WIN_VALUE:
+            value = WIN_VALUE
+        else:
+            value = values.get(zobrist_hash(child, ztable), UNKNOWN_VALUE)
+        if best_value is None or value > best_value:
+            best_value = value
+            best_moves = []
+        if value == best_value:
+            best_moves.append((move, child))
+    return best_moves
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def evaluate_policy(ztable, values, me=FIRST_PIECE_CELL):
+    """Evaluates the learner greedy choice in every reachable position
+       where it has to move. Returns a list of decisions, one for each
+       position: (cells, loss, greedy moves, optimal moves), where the
+       loss is the difference between the optimal value and the value
+       of the worst move among the greedy ones"""
+    memo = {}
+    decisions = []
+    for cells, to_move in reachable_positions():
+        if to_move != me or terminal_value(cells, me) is not None:
+            continue
+        move_values = {move: position_value(child, other_cell(me), me, None, memo)
+                       for move, child in children(cells, me)}
+        optimal_value = max(move_values.values())
+        optimal_moves = [move for move, value in move_values.items() if value == optimal_value]
+        greedy = [move for move, _ in greedy_moves(cells, me, values, ztable)]
+        loss = optimal_value - min(move_values[move] for move in greedy)
+        decisions.append((cells, loss, greedy, optimal_moves))
+    return decisions
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+#   ***  MAIN ***
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def main():
+    """Main program: parses options, loads learned data, evaluates the
+        learner policy and prints the results"""
+
+    parser = ArgumentParser()
+    parser.add_argument("loaddata", type=file_to_load,
+                        help="learned data file saved by learnttt.py (.npz or prepared model)")
+    parser.add_argument("-w", "--worst", type=int, default=10,
+                        help="number of worst positions to list")
+    args = parser.parse_args()
+
+    if is_value_table_file(args.loaddata):
+        values = load_value_table(args.loaddata)
+        ztable = values.ztable
+    else:
+        init_data = np.load(args.loaddata, allow_pickle=True)
+        ztable = init_data['zobrist_hash']
+        values = init_data['value_tuple'].item()
+
+    start = time.perf_counter()
+    decisions = evaluate_policy(ztable, values)
+    elapsed = time.perf_counter() - start
+
+    suboptimal = [decision for decision in decisions if decision[1] > 0]
+    # with ties, the learner picks one of the greedy moves at random
+    expected_suboptimal = sum(
+        sum(move not in optimal for move in greedy) / len(greedy)
+        for _, _, greedy, optimal in decisions)
+    print(f"learned positions    : {len(values)}")
+    print(f"evaluated positions  : {len(decisions)} ({elapsed:.2f} seconds)")
+    print(f"suboptimal decisions : {len(suboptimal)} ({len(suboptimal) / len(decisions):.4f})")
+    print(f"expected suboptimal  : {expected_suboptimal:.1f}"
+          f" ({expected_suboptimal / len(decisions):.4f}, with random tie breaking)")
+
+    if suboptimal and args.worst > 0:
+        # earlier positions first: they are met in more games
+        suboptimal.sort(key=lambda decision: (-decision[1], 9 - decision[0].count(EMPTY_CELL)))
+        print("worst positions (x = learner, loss: 1.0 = win -> loss, 0.5 = win -> draw"
+              " or draw -> loss):")
+        for cells, loss, greedy, optimal in suboptimal[:args.worst]:
+            print(f"  {position_to_string(cells)}  loss = {loss:.1f}"
+                  f"  greedy = {','.join(move_to_movestring(move) for move in greedy)}"
+                  f"  optimal = {','.join(move_to_movestring(move) for move in optimal)}")
+
+
+# --------------------------------------------------------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#
+"""Exhaustive analysis of the tic-tac-toe game tree.
+   Positions are represented as tuples of 9 cells (row by row), where
+   0 is an empty cell, 1 a pawn of the first piece of the board and
+   2 a pawn of the second piece. The Zobrist hash of a position is
+   computed with the same table used by the jokettt Board, so the
+   values produced here can be used directly as learner values."""
+
+EMPTY_CELL = 0
+FIRST_PIECE_CELL = 1
+SECOND_PIECE_CELL = 2
+
+WIN_VALUE = 1.0
+DRAW_VALUE = 0.5
+LOSS_VALUE = 0.0
+UNKNOWN_VALUE = 0.5
+DEFAULT_PRESEED_DEPTH = 2
+
+WIN_LINES = ((0, 1, 2), (3, 4, 5), (6, 7, 8),
+             (0, 3, 6), (1, 4, 7), (2, 5, 8),
+             (0, 4, 8), (2, 4, 6))
+
+EMPTY_POSITION = (EMPTY_CELL,) * 9
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def other_cell(cell):
+    """Returns the cell value of the other piece"""
+    if cell == FIRST_PIECE_CELL:
+        return SECOND_PIECE_CELL
+    return FIRST_PIECE_CELL
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def winner(cells):
+    """Returns the cell value of the winning piece, or EMPTY_CELL
+       if nobody has three pawns in a row"""
+    for _a, _b, _c in WIN_LINES:
+        if cells[_a] != EMPTY_CELL and cells[_a] == cells[_b] == cells[_c]:
+            return cells[_a]
+    return EMPTY_CELL
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def terminal_value(cells, me):
+    """Returns the exact value of a terminal position from the point
+       of view of the piece 'me', or None if the game is not over"""
+    win_cell = winner(cells)
+    if win_cell == me:
+        return WIN_VALUE
+    if win_cell != EMPTY_CELL:
+        return LOSS_VALUE
+    if EMPTY_CELL not in cells:
+        return DRAW_VALUE
+    return None
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def zobrist_hash(cells, ztable):
+    """Computes the Zobrist hash of a position, as the jokettt Board does"""
+    zhash = 0
+    for ndx, cell in enumerate(cells):
+        if cell != EMPTY_CELL:
+            zhash ^= int(ztable[ndx // 3][ndx % 3][cell - 1])
+    return zhash
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def children(cells, to_move):
+    """Returns the list of (move index, position) reachable with a
+       single move of the piece 'to_move'"""
+    result = []
+    for ndx, cell in enumerate(cells):
+        if cell == EMPTY_CELL:
+            result.append((ndx, cells[:ndx] + (to_move,) + cells[ndx + 1:]))
+    return result
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def reachable_positions(first_to_move=(FIRST_PIECE_CELL, SECOND_PIECE_CELL)):
+    """Enumerates every position reachable from the empty board.
+       Returns the set of (cells, to_move) pairs, each visited once,
+       for games started by any of the pieces in 'first_to_move'"""
+    visited = set()
+    stack = [(EMPTY_POSITION, first) for first in first_to_move]
+    while stack:
+        node = stack.pop()
+        if node in visited:
+            continue
+        visited.add(node)
+        cells, to_move = node
+        if winner(cells) != EMPTY_CELL:
+            continue
+        for _, child in children(cells, to_move):
+            stack.append((child, other_cell(to_move)))
+    return visited
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def position_value(cells, to_move, me, depth=None, memo=None):
+    """Minimax value of a position from the point of view of 'me',
+       with the piece 'to_move' to play. If depth is None the value
+       is exact, otherwise the search stops after 'depth' moves and
+       the unresolved positions are valued UNKNOWN_VALUE"""
+    if memo is None:
+        memo = {}
+    key = (cells, to_move, depth)
+    if key in memo:
+        return memo[key]
+
+    value = terminal_value(cells, me)
+    if value is None:
+        if depth == 0:
+            value = UNKNOWN_VALUE
+        else:
+            next_depth = None if depth is None else depth - 1
+            child_values = [position_value(child, other_cell(to_move), me, next_depth, memo)
+                            for _, child in children(cells, to_move)]
+            if to_move == me:
+                value = max(child_values)
+            else:
+                value = min(child_values)
+
+    memo[key] = value
+    return value
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def build_preseed_values(ztable, me=FIRST_PIECE_CELL, depth=DEFAULT_PRESEED_DEPTH):
+    """Builds an initial learner value table, keyed by Zobrist hash.
+       Every reachable terminal position gets its exact value; if
+       depth > 0 the other positions get a 'depth' moves lookahead
+       estimate, otherwise they are left to the learner default.
+       Note that the terminal values alone do not help the learner: it
+       already values winning moves 1.0 and lost boards 0.0, and it
+       never chooses among boards where the opponent has just won"""
+    memo = {}
+    values = {}
+    estimated_with_me_to_move = set()
+    for cells, to_move in reachable_positions():
+        value = terminal_value(cells, me)
+        if value is None:
+            if depth <= 0:
+                continue
+            zhash = zobrist_hash(cells, ztable)
+            # The same board can be reached with either piece to move
+            # (it depends on who started the game). The learner chooses
+            # its moves looking at the boards left to the opponent, so
+            # that estimate wins over the other one
+            if zhash in values and zhash not in estimated_with_me_to_move:
+                continue
+            values[zhash] = position_value(cells, to_move, me, depth, memo)
+            if to_move == me:
+                estimated_with_me_to_move.add(zhash)
+            else:
+                estimated_with_me_to_move.discard(zhash)
+        else:
+            values[zobrist_hash(cells, ztable)] = value
+    return values
@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 #
 """Play tic-tac-toe games between a learner players and another
-   AI player (minimax, random or another learner).
+   AI player (minimax, random, another learner or the learner itself).
    At the end of the training save the 'learned' data"""
 
 from argparse import ArgumentParser, ArgumentTypeError
+from collections.abc import MutableMapping
 
 import os
 import sys
@@ -16,10 +17,15 @@ from jokettt.board import Board
 from jokettt.learnerplayer import LearnerPlayer
 from jokettt.minimaxplayer import MinimaxPlayer
 
+from gametree import build_preseed_values, DEFAULT_PRESEED_DEPTH
+from sharedtable import is_value_table_file, load_value_table, save_value_table
+from tdlearning import DEFAULT_LAMBDA_VALUE, TDLambdaTrainer, lambda_value
+
 LEARNER_PIECE = 'x'
 OPPONENT_PIECE = 'o'
 DEFAULT_ALPHA_VALUE = 0.1
 DEFAULT_EPS_VALUE = 0.1
+OPPONENT_TYPES = ["minimax", "learner", "self", "random"]
 
 # --------------------------------------------------------------------
 # --------------------------------------------------------------------
@@ -62,6 +68,70 @@ def number_of_games(_n):
         raise ArgumentTypeError("illegal value %r. Shall be a positive integer" % (num_games,))
     return num_games
 
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def lookahead_depth(_n):
+    """Definition of argument type for preseed lookahead depth,
+       an integer in the range [0, 9]"""
+    try:
+        depth = int(_n)
+    except ValueError:
+        raise ArgumentTypeError("%r not an integer" % (_n,))
+
+    if depth < 0 or depth > 9:
+        raise ArgumentTypeError("%r not in range [0, 9]" % (depth,))
+    return depth
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def parse_opponent_weights(tokens):
+    """Parse a list of "<opponent type>=<weight>" strings in a
+       dictionary of opponent type -> weight"""
+    weights = {}
+    for token in tokens:
+        name, sep, weight = token.partition("=")
+        if not sep or name not in OPPONENT_TYPES:
+            raise ArgumentTypeError("%r is not <opponent>=<weight>, with <opponent> in %s" %
+                                    (token, OPPONENT_TYPES))
+        try:
+            weights[name] = float(weight)
+        except ValueError:
+            raise ArgumentTypeError("%r not a floating point literal" % (weight,))
+        if weights[name] < 0.0:
+            raise ArgumentTypeError("illegal weight %r. Shall be a positive number" % (weight,))
+    if sum(weights.values()) <= 0.0:
+        raise ArgumentTypeError("at least one opponent shall have a positive weight")
+    return weights
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def opponent_mixture(_x):
+    """Definition of argument type for a fixed opponent mixture,
+       a comma separated list of <opponent>=<weight> (e.g.
+       "random=0.5,learner=0.2,minimax=0.3"). Returns a schedule
+       made of a single stage"""
+    return [(0, parse_opponent_weights(_x.split(",")))]
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def schedule_file(_x):
+    """Definition of argument type for an opponent schedule file.
+       Every line of the file is a stage of the training, in the form
+       "<number of games> <opponent>=<weight> ...". A number of games
+       equal to zero means that the stage lasts until the end.
+       Empty lines and comments (starting with '#') are ignored"""
+    file_to_load(_x)
+    schedule = []
+    with open(_x) as sfile:
+        for line in sfile:
+            tokens = line.partition("#")[0].split()
+            if not tokens:
+                continue
+            schedule.append((number_of_games(tokens[0]), parse_opponent_weights(tokens[1:])))
+    if not schedule:
+        raise ArgumentTypeError("%s does not contain any stage" % (_x,))
+    return schedule
+
 # --------------------------------------------------------------------
 # --------------------------------------------------------------------
 def file_to_save(_x):
@@ -95,8 +165,87 @@ def build_random_ztable_initdata():
 
 # --------------------------------------------------------------------
 # --------------------------------------------------------------------
-def play_ai_vs_ai_game(player_a, player_b, board, player_a_first, verbosity_level):
-    """Play a tic-tac-toe game between two AI players"""
+class MirroredValues(MutableMapping):
+    """The values of a learner seen from the side of its opponent.
+       A position valued v by the learner is valued 1 - v by the
+       opponent, and what the opponent learns is written back in the
+       learner values"""
+
+    # --------------------------------------------------------------
+    def __init__(self, values):
+        """MirroredValues class constructor. Save the learner values"""
+        self.values = values
+
+    # --------------------------------------------------------------
+    def __getitem__(self, zhash):
+        return 1.0 - self.values[zhash]
+
+    # --------------------------------------------------------------
+    def __contains__(self, zhash):
+        return zhash in self.values
+
+    # --------------------------------------------------------------
+    def __setitem__(self, zhash, value):
+        self.values[zhash] = 1.0 - value
+
+    # --------------------------------------------------------------
+    def __delitem__(self, zhash):
+        del self.values[zhash]
+
+    # --------------------------------------------------------------
+    def __iter__(self):
+        return iter(self.values)
+
+    # --------------------------------------------------------------
+    def __len__(self):
+        return len(self.values)
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def build_opponent(opponenttype, board, alpha, eps, verbosity, learner=None):
+    """Build an opponent player of the given type. A "self" opponent
+       plays with the values of the given learner, seen from its side"""
+    if opponenttype == "minimax":
+        if verbosity > 0:
+            print("OPPONENT IS A SMART MINIMAX PLAYER")
+        return MinimaxPlayer(OPPONENT_PIECE)
+    if opponenttype == "learner":
+        if verbosity > 0:
+            print(f"OPPONENT IS A LEARNER PLAYER --- alpha = {alpha}, eps = {eps}")
+        return LearnerPlayer(OPPONENT_PIECE, board, {}, alpha, eps)
+    if opponenttype == "self":
+        if verbosity > 0:
+            print(f"OPPONENT IS THE LEARNER ITSELF --- alpha = {alpha}, eps = {eps}")
+        return LearnerPlayer(OPPONENT_PIECE, board, MirroredValues(learner.values), alpha, eps)
+    if verbosity > 0:
+        print("OPPONENT IS A RANDOM (DUMB) PLAYER")
+    return MinimaxPlayer(OPPONENT_PIECE, True)
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def select_opponent_type(schedule, num_games):
+    """Select the type of the opponent for the next game, given the
+       opponent schedule and the number of games already played.
+       After the last stage its weights are used until the end"""
+    weights = schedule[-1][1]
+    stage_end = 0
+    for stage_games, stage_weights in schedule:
+        stage_end += stage_games
+        if stage_games == 0 or num_games < stage_end:
+            weights = stage_weights
+            break
+    return random.choices(list(weights.keys()), list(weights.values()))[0]
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def play_ai_vs_ai_game(player_a, player_b, board, player_a_first, verbosity_level,
+                       td_trainers=None):
+    """Play a tic-tac-toe game between two AI players.
+       The learners with a TD(lambda) trainer in td_trainers (a
+       player -> trainer dictionary) learn from every outcome, the
+       other learners only from their defeats"""
+    if td_trainers is None:
+        td_trainers = {}
     result = 0
     if verbosity_level > 0:
         print("----------------------------------------------------")
@@ -109,10 +258,14 @@ def play_ai_vs_ai_game(player_a, player_b, board, player_a_first, verbosity_leve
 
         if player_a_turn:
             _x, _y = player_a.move(board)
-            _, result = board.place_pawn(_x, _y, player_a.piece)
+            zhash, result = board.place_pawn(_x, _y, player_a.piece)
+            if player_a in td_trainers:
+                td_trainers[player_a].record(zhash)
         else:
             _x, _y = player_b.move(board)
-            _, result = board.place_pawn(_x, _y, player_b.piece)
+            zhash, result = board.place_pawn(_x, _y, player_b.piece)
+            if player_b in td_trainers:
+                td_trainers[player_b].record(zhash)
             result = -result
 
         if verbosity_level > 1:
@@ -122,30 +275,38 @@ def play_ai_vs_ai_game(player_a, player_b, board, player_a_first, verbosity_leve
     if verbosity_level > 1:
         print('%s' % board)
 
+    for trainer in td_trainers.values():
+        trainer.learn_from_outcome(board)
+
     if result > 0:
         # player_a wins
-        if isinstance(player_b, LearnerPlayer):
+        if isinstance(player_b, LearnerPlayer) and player_b not in td_trainers:
             player_b.learn_from_defeat(board)
         return 1, player_a.exploring_move_flag()
     if result < 0:
         # player_b player wins
-        if isinstance(player_a, LearnerPlayer):
+        if isinstance(player_a, LearnerPlayer) and player_a not in td_trainers:
             player_a.learn_from_defeat(board)
         return -1, player_a.exploring_move_flag()
     # draw
     return 0, player_a.exploring_move_flag()
 
 # --------------------------------------------------------------------
-def update_results_and_print_statistics(res, total_games, results, verbosity = 0):
+def update_results_and_print_statistics(res, total_games, results, opponenttype, verbosity = 0):
     """Update results and print games statistics"""
+    opponent_results = results['opponent'].setdefault(
+        opponenttype, {'player_a_win': 0, 'player_b_win': 0, 'draw': 0})
     if res > 0:
         results['player_a_win'] += 1
+        opponent_results['player_a_win'] += 1
         result_string = "Player A wins "
     elif res < 0:
         results['player_b_win'] += 1
+        opponent_results['player_b_win'] += 1
         result_string = "Player B wins "
     else:
         results['draw'] += 1
+        opponent_results['draw'] += 1
         result_string = "Draw          "
     perc_draw = results['draw'] / total_games
     perc_a_win = results['player_a_win'] / total_games
@@ -155,9 +316,20 @@ def update_results_and_print_statistics(res, total_games, results, verbosity = 0
               f"[draw = {results['draw']},"
               f" Awin = {results['player_a_win']},"
               f" Bwin = {results['player_b_win']}] - "
-              f"[{perc_draw:.3f}, {perc_a_win:.3f}, {perc_b_win:.3f}]")
+              f"[{perc_draw:.3f}, {perc_a_win:.3f}, {perc_b_win:.3f}] - vs {opponenttype}")
     else:
-        print(f"{total_games},{perc_draw:.5f}")
+        print(f"{total_games},{perc_draw:.5f},{opponenttype}")
+
+# --------------------------------------------------------------------
+def print_opponent_statistics(results):
+    """Print games statistics grouped by opponent type"""
+    for opponenttype, opponent_results in results['opponent'].items():
+        num_games = sum(opponent_results.values())
+        print(f"vs {opponenttype:8s}: {num_games} games --- "
+              f"[draw = {opponent_results['draw']},"
+              f" Awin = {opponent_results['player_a_win']},"
+              f" Bwin = {opponent_results['player_b_win']}] - "
+              f"[{opponent_results['draw'] / num_games:.3f}]")
 # --------------------------------------------------------------------
 # --------------------------------------------------------------------
 #   ***  MAIN ***
@@ -170,27 +342,54 @@ def main():
     # --------------------------------------------------
     # Parse command line arguments
     parser = ArgumentParser()
-    parser.add_argument("-t", "--opponenttype", choices=["minimax", "learner", "random"],
+    parser.add_argument("-t", "--opponenttype", choices=OPPONENT_TYPES,
                         help="the mode of the opponent player", default="minimax")
+    curriculum = parser.add_mutually_exclusive_group()
+    curriculum.add_argument("--mixture", type=opponent_mixture,
+                            help="choose the opponent of every game from a weighted mixture, "
+                                 "e.g. random=0.5,self=0.2,minimax=0.3 (overrides -t)")
+    curriculum.add_argument("--schedule", type=schedule_file,
+                            help="change the opponent mixture during the training following "
+                                 "the stages in the given schedule file (overrides -t)")
     parser.add_argument("--alpha1", type=alpha_value, default=0.1,
                         help="alpha parameter for the learner player")
     parser.add_argument("--alpha2", type=alpha_value, default=0.1,
-                        help="alpha parameter for the opponent player (only if learner)")
+                        help="alpha parameter for the opponent player (only if learner or self)")
     parser.add_argument("--eps1", type=eps_value, default=0.1,
                         help="epsilon parameter for the learner player")
     parser.add_argument("--eps2", type=eps_value, default=0.1,
-                        help="epsilon parameter for the opponent player (only if learner)")
+                        help="epsilon parameter for the opponent player (only if learner or self)")
     parser.add_argument("-n", "--num_games", type=number_of_games, default=100,
                         help="Number of games to play")
+    parser.add_argument("--learning", choices=["defeat", "td"], default="defeat",
+                        help="end of game learning of the learners: only from defeats, "
+                             "or from every outcome with TD(lambda) eligibility traces")
+    parser.add_argument("--lambda", dest="td_lambda", type=lambda_value,
+                        default=DEFAULT_LAMBDA_VALUE,
+                        help="lambda parameter of TD(lambda) learning (only if td)")
     parser.add_argument("--switch_turn", action="store_true",
                         help="swith first move between players")
     parser.add_argument("-l", "--loaddata", type=file_to_load,
-                        help="load learned data from file")
+                        help="load learned data from file (.npz or prepared model)")
     parser.add_argument("-s", "--savedata", type=file_to_save,
                         help="save learned data to file")
+    parser.add_argument("-m", "--savemodel", type=file_to_save,
+                        help="save learned data to a prepared model file, "
+                             "ready to be loaded by play_vs_learner.py")
+    parser.add_argument("--preseed", action="store_true",
+                        help="pre-seed learner values with a lookahead estimate of all the "
+                             "reachable positions")
+    parser.add_argument("--preseed_depth", type=lookahead_depth,
+                        help="lookahead depth of the pre-seed estimates (only if preseed, "
+                             "default %d; 0 seeds only the terminal positions, that gives "
+                             "no speedup)" % DEFAULT_PRESEED_DEPTH)
     parser.add_argument("-v", "--verbosity", action="count",
                         help="increase output verbosity")
     args = parser.parse_args()
+    if args.preseed_depth is not None and not args.preseed:
+        parser.error("--preseed_depth requires --preseed")
+    if args.preseed_depth is None:
+        args.preseed_depth = DEFAULT_PRESEED_DEPTH
     if args.verbosity:
         verbosity = args.verbosity
     else:
@@ -216,7 +415,13 @@ def main():
 
     # --------------------------------------------------
     # If requested, load learned data
-    if args.loaddata:
+    if args.loaddata and is_value_table_file(args.loaddata):
+        print("...loading prepared model from %s" % args.loaddata)
+        model = load_value_table(args.loaddata)
+        init_ztable = np.array(model.ztable)
+        init_values = dict(model)
+
+    elif args.loaddata:
         try:
             print("...loading data from %s" % args.loaddata)
             init_data = np.load(args.loaddata, allow_pickle=True)
@@ -241,58 +446,92 @@ def main():
         init_ztable = build_random_ztable_initdata()
         init_values = {}
 
+    # --------------------------------------------------
+    # If requested, pre-seed learner values. Loaded data
+    # takes precedence over the computed estimates
+    if args.preseed:
+        preseed_values = build_preseed_values(init_ztable, depth=args.preseed_depth)
+        if verbosity > 0:
+            print(f"...pre-seeded {len(preseed_values)} positions"
+                  f" (lookahead depth = {args.preseed_depth})")
+        preseed_values.update(init_values)
+        init_values = preseed_values
+
     if verbosity > 0:
         if args.savedata:
             print("...the learned data will be saved to %s.npz" % args.savedata)
         else:
             print("...the learned data will not be saved")
+        if args.savemodel:
+            print("...the learned data will be saved to prepared model %s" % args.savemodel)
 
     # --------------------------------------------------
     # Declares board and players
     board = Board(LEARNER_PIECE, OPPONENT_PIECE, init_ztable)
     player_a = LearnerPlayer(LEARNER_PIECE, board, init_values, alpha1, eps1, verbosity-1)
     if verbosity > 0:
-        print(f"LEARNER PLAYER --- alpha = {alpha1}, eps = {eps1}")
+        print(f"LEARNER PLAYER --- alpha = {alpha1}, eps = {eps1}, learning = {args.learning}")
 
-    if args.opponenttype == "minimax":
-        player_b = MinimaxPlayer(OPPONENT_PIECE)
-        if verbosity > 0:
-            print("OPPONENT IS A SMART MINIMAX PLAYER")
-    elif args.opponenttype == "learner":
-        player_b = LearnerPlayer(OPPONENT_PIECE, board, alpha2, eps2)
-        if verbosity > 0:
-            print(f"OPPONENT IS A LEARNER PLAYER --- alpha = {alpha2}, eps = {eps2}")
+    if args.schedule:
+        schedule = args.schedule
+    elif args.mixture:
+        schedule = args.mixture
     else:
-        player_b = MinimaxPlayer(OPPONENT_PIECE, True)
-        if verbosity > 0:
-            print("OPPONENT IS A RANDOM (DUMB) PLAYER")
+        schedule = [(0, {args.opponenttype: 1.0})]
+
+    opponents = {}
+    for stage in schedule:
+        for opponenttype in stage[1]:
+            if opponenttype not in opponents:
+                opponents[opponenttype] = build_opponent(opponenttype, board,
+                                                         alpha2, eps2, verbosity, player_a)
+
+    # with TD(lambda) learning, every learner gets its trainer
+    td_trainers = {}
+    if args.learning == "td":
+        td_trainers[player_a] = TDLambdaTrainer(player_a, alpha1, args.td_lambda)
+        for opponenttype in ("learner", "self"):
+            if opponenttype in opponents:
+                td_trainers[opponents[opponenttype]] = TDLambdaTrainer(opponents[opponenttype],
+                                                                       alpha2, args.td_lambda)
 
     # --------------------------------------------------
     # Play games
     if verbosity > 0:
         print(" playing ", args .num_games, " games")
     else:
-        print("num_games,percentage_draws")
+        print("num_games,percentage_draws,opponent")
 
     results = {}
     results['player_a_win'] = 0
     results['player_b_win'] = 0
     results['draw'] = 0
+    results['opponent'] = {}
     total_games = 0
     player_a_turn = True
 
     while total_games < args.num_games:
-        res, expl_move_done = play_ai_vs_ai_game(player_a, player_b, board, player_a_turn, verbosity-1)
+        # the stages are counted in statistic games, as -n
+        opponenttype = select_opponent_type(schedule, total_games)
+        player_b = opponents[opponenttype]
+        game_trainers = {player: td_trainers[player] for player in (player_a, player_b)
+                         if player in td_trainers}
+        res, expl_move_done = play_ai_vs_ai_game(player_a, player_b, board, player_a_turn,
+                                                 verbosity-1, game_trainers)
         if expl_move_done:
             if verbosity > 0:
                 print("game skipped for statistics because an exploring move was done")
         else:
             total_games += 1
-            update_results_and_print_statistics(res, total_games, results, verbosity)
+            update_results_and_print_statistics(res, total_games, results,
+                                                opponenttype, verbosity)
         if args.switch_turn:
             player_a_turn = not player_a_turn
         board.reset()
 
+    if verbosity > 0:
+        print_opponent_statistics(results)
+
     # --------------------------------------------------
     # If requested, save learned data
     if args.savedata:
@@ -300,6 +539,8 @@ def main():
                  value_tuple = player_a.values)
         ###print(board.zhash_table)
         ###print(player_a.values)
+    if args.savemodel:
+        save_value_table(args.savemodel, board.zhash_table, player_a.values)
 
     # --------------------------------------------------
     # Exits
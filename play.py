@@ -1,18 +1,14 @@
 #!/usr/bin/env python3
 #
-"""Play a series of tic-tac-toe games between an human and an AI player"""
+"""Play a series of tic-tac-toe games between an human and an AI player.
+   The engine modules are imported after the options parsing, so only
+   --help and the option errors skip them"""
 from argparse import ArgumentParser
 
+import atexit
 import sys
 import random
 
-import numpy as np
-
-from jokettt.board import Board
-from jokettt.consoleplayer import ConsolePlayer
-from jokettt.minimaxplayer import MinimaxPlayer
-from jokettt.learnerplayer import LearnerPlayer
-
 # --------------------------------------------------------------------
 # --------------------------------------------------------------------
 def play_human_vs_ai_game(human_player, ai_player, first_ai, board):
@@ -48,8 +44,8 @@ def play_human_vs_ai_game(human_player, ai_player, first_ai, board):
         # AI player wins
         return -1
     if result > 0:
-        # Human wins
-        if isinstance(ai_player, LearnerPlayer):
+        # Human wins: a learner player learns from its defeat
+        if hasattr(ai_player, "learn_from_defeat"):
             ai_player.learn_from_defeat(board)
         return 1
     # draw
@@ -75,12 +71,28 @@ def main():
                         choices=["minimax", "learner"], nargs='?', default="minimax")
     parser.add_argument("-v", "--verbosity", action="count",
                         help="increase output verbosity")
+    parser.add_argument("--shared", metavar="NAME",
+                        help="share the learner data with the other processes using "
+                             "the same NAME, through a shared memory segment (only if learner)")
     args = parser.parse_args()
+    if args.shared and args.player_mode != "learner":
+        parser.error("--shared is only available for the learner player")
     if args.verbosity:
         verbosity = args.verbosity
     else:
         verbosity = 0
 
+    # imported here, after the options parsing, so that --help and
+    # the option errors do not wait for them
+    # pylint: disable=import-outside-toplevel
+    from jokettt.board import Board
+    from jokettt.consoleplayer import ConsolePlayer
+    from jokettt.minimaxplayer import MinimaxPlayer
+    from jokettt.learnerplayer import LearnerPlayer
+
+    from sharedtable import SharedValueTable
+    # pylint: enable=import-outside-toplevel
+
     # --------------------------------------------------
     # 2. PRINTS SOME INFORMATION
     print(f"TYPE OF AI PLAYER = {args.player_mode}")
@@ -92,7 +104,15 @@ def main():
     if args.player_mode == "minimax":
         auto_player = MinimaxPlayer(AI_PIECE, False, verbosity)
     else:
-        auto_player = LearnerPlayer(AI_PIECE, board, {}, ALPHA_VALUE, EPS_VALUE, verbosity)
+        if args.shared:
+            # the first process creates the shared data with the
+            # hash table of its board, the others use its hash table
+            values = SharedValueTable(args.shared, board.zhash_table)
+            atexit.register(values.close)
+            board = Board(AI_PIECE, HUMAN_PIECE, values.ztable)
+        else:
+            values = {}
+        auto_player = LearnerPlayer(AI_PIECE, board, values, ALPHA_VALUE, EPS_VALUE, verbosity)
 
     console_player = ConsolePlayer(HUMAN_PIECE, verbosity)
 
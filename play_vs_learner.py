@@ -1,8 +1,13 @@
 #!/usr/bin/env python3
 #
-"""Play a series of tic-tac-toe games between an human and an AI learner player"""
+"""Play a series of tic-tac-toe games between an human and an AI learner player.
+   The learned data can be loaded from a prepared model file, that is
+   ready to be queried without deserializing it. The engine modules are
+   imported after the options parsing, so only --help and the option
+   errors skip them (numpy is always imported)"""
 from argparse import ArgumentParser, ArgumentTypeError
 
+import atexit
 import os
 import sys
 import random
@@ -10,11 +15,7 @@ import signal
 
 import numpy as np
 
-from jokettt.board import Board
-from jokettt.consoleplayer import ConsolePlayer
-from jokettt.learnerplayer import LearnerPlayer
-
-
+from tdlearning import DEFAULT_LAMBDA_VALUE, lambda_value
 
 # --------------------------------------------------------------------
 # --------------------------------------------------------------------
@@ -48,8 +49,10 @@ def build_random_ztable_initdata():
 
 # --------------------------------------------------------------------
 # --------------------------------------------------------------------
-def play_human_vs_ai_game(human_player, ai_player, first_ai, board):
-    """Play a tic-tac-toe game between an human and an AI learner player"""
+def play_human_vs_ai_game(human_player, ai_player, first_ai, board, td_trainer=None):
+    """Play a tic-tac-toe game between an human and an AI learner player.
+       If a TD(lambda) trainer is given, the learner learns from every
+       outcome, otherwise only from its defeats"""
     result = 0
     print("----------------------------------------------------")
     if first_ai:
@@ -69,7 +72,9 @@ def play_human_vs_ai_game(human_player, ai_player, first_ai, board):
             _, result = board.place_pawn(_x, _y, human_player.piece)
         else:
             _x, _y = ai_player.move(board)
-            _, result = board.place_pawn(_x, _y, ai_player.piece)
+            zhash, result = board.place_pawn(_x, _y, ai_player.piece)
+            if td_trainer is not None:
+                td_trainer.record(zhash)
             result = -result
 
         print('%s' % board)
@@ -77,12 +82,16 @@ def play_human_vs_ai_game(human_player, ai_player, first_ai, board):
 
     print('%s' % board)
 
+    if td_trainer is not None:
+        td_trainer.learn_from_outcome(board)
+
     if result < 0:
         # AI player wins
         return -1
     if result > 0:
         # Human wins
-        ai_player.learn_from_defeat(board)
+        if td_trainer is None:
+            ai_player.learn_from_defeat(board)
         return 1
     # draw
     return 0
@@ -105,19 +114,47 @@ def main():
     parser.add_argument("-v", "--verbosity", action="count",
                         help="increase output verbosity")
     parser.add_argument("-l", "--loaddata", type=file_to_load,
-                        help="load learned data from file")
+                        help="load learned data from file (.npz or prepared model)")
     parser.add_argument("-s", "--savedata", type=file_to_save,
                         help="save learned data from file")
+    parser.add_argument("-m", "--savemodel", type=file_to_save,
+                        help="save learned data to a prepared model file")
+    parser.add_argument("--learning", choices=["defeat", "td"], default="defeat",
+                        help="end of game learning: only from defeats, or from every "
+                             "outcome with TD(lambda) eligibility traces")
+    parser.add_argument("--lambda", dest="td_lambda", type=lambda_value,
+                        default=DEFAULT_LAMBDA_VALUE,
+                        help="lambda parameter of TD(lambda) learning (only if td)")
+    parser.add_argument("--shared", metavar="NAME",
+                        help="share the learned data with the other processes using "
+                             "the same NAME, through a shared memory segment")
     args = parser.parse_args()
     if args.verbosity:
         verbosity = args.verbosity
     else:
         verbosity = 0
 
+    # imported here, after the options parsing, so that --help and
+    # the option errors do not wait for them
+    # pylint: disable=import-outside-toplevel
+    from jokettt.board import Board
+    from jokettt.consoleplayer import ConsolePlayer
+    from jokettt.learnerplayer import LearnerPlayer
+
+    from sharedtable import (SharedValueTable, is_value_table_file,
+                             load_value_table, save_value_table)
+    from tdlearning import TDLambdaTrainer
+    # pylint: enable=import-outside-toplevel
+
     # --------------------------------------------------
     # 2. if requested, load learned data
     print("...loading data from %s" % args.loaddata)
-    if args.loaddata:
+    if args.loaddata and is_value_table_file(args.loaddata):
+        # prepared model: mapped in memory, ready to be used
+        init_values = load_value_table(args.loaddata)
+        init_ztable = init_values.ztable
+
+    elif args.loaddata:
         try:
             init_data = np.load(args.loaddata, allow_pickle=True)
         except:
@@ -146,12 +183,27 @@ def main():
         print("...the learned data will be saved to %s.npz" % args.savedata)
     else:
         print("...the learned data will not be saved")
+    if args.savemodel:
+        print("...the learned data will be saved to prepared model %s" % args.savemodel)
+
+    # --------------------------------------------------
+    # if requested, attach to the shared learned data. The first
+    # process creates it with its own data, the others use it as is
+    if args.shared:
+        init_values = SharedValueTable(args.shared, init_ztable, init_values)
+        init_ztable = init_values.ztable
+        atexit.register(init_values.close)
+        print("...sharing learned data (%d positions) as %s" % (len(init_values), args.shared))
 
     # --------------------------------------------------
     # 3. DECLARES BOARD AND PLAYERS
     board = Board(AI_PIECE, HUMAN_PIECE, init_ztable)
     auto_player = LearnerPlayer(AI_PIECE, board, init_values, ALPHA_VALUE, verbosity)
     console_player = ConsolePlayer(HUMAN_PIECE, verbosity)
+    if args.learning == "td":
+        td_trainer = TDLambdaTrainer(auto_player, ALPHA_VALUE, args.td_lambda)
+    else:
+        td_trainer = None
 
     # --------------------------------------------------
     # installs SIGINT signal handler
@@ -160,9 +212,12 @@ def main():
         if args.savedata:
             print('\n------------------ saving learned data end exiting ----')
             np.savez(args.savedata, zobrist_hash = board.zhash_table,
-                     value_tuple = auto_player.values)
+                     value_tuple = dict(auto_player.values))
             print(board.zhash_table)
-            print(auto_player.values)
+            print(dict(auto_player.values))
+        if args.savemodel:
+            print('\n------------------ saving prepared model end exiting ----')
+            save_value_table(args.savemodel, board.zhash_table, auto_player.values)
         sys.exit(0)
 
     signal.signal(signal.SIGINT, signal_handler)
@@ -173,7 +228,7 @@ def main():
     while True:
         board.reset()
 
-        res = play_human_vs_ai_game(console_player, auto_player, first_ai, board)
+        res = play_human_vs_ai_game(console_player, auto_player, first_ai, board, td_trainer)
 
         if res < 0:
             print("You lose! :-D")
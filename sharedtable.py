@@ -0,0 +1,306 @@
+#
+"""Learner value table stored in a flat memory buffer, so that it can
+   live in a shared memory segment attached by all the processes of a
+   host. The table is an open addressing hash table (linear probing)
+   that maps a Zobrist hash to a value, and it also stores the Zobrist
+   table used to compute the hashes, so that all the processes agree
+   on them.
+   Reads do not take any lock. Every single store is serialized among
+   processes with a lock file, and a new entry becomes visible to the
+   readers only when its key and value are already written. A read
+   followed by a store (as "values[zhash] += delta" in LearnerPlayer)
+   is not atomic: two processes updating the same position at the same
+   time can lose one of the two updates.
+   The same table can be saved to a "prepared model" file, that is
+   mapped in memory when loaded: it is ready to be queried without
+   deserializing its entries."""
+
+from collections.abc import MutableMapping
+from contextlib import contextmanager, nullcontext
+from multiprocessing import shared_memory, resource_tracker
+
+import fcntl
+import mmap
+import os
+import tempfile
+
+import numpy as np
+
+TABLE_MAGIC = 0x6a6f6b6574747476     # "joketttv"
+DEFAULT_CAPACITY = 1 << 15           # more than 3 times the reachable positions
+HEADER_SIZE = 4
+HEADER_MAGIC = 0
+HEADER_CAPACITY = 1
+HEADER_COUNT = 2
+# header[3] is reserved
+ZTABLE_SHAPE = (3, 3, 2)
+ZTABLE_SIZE = 18
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def table_size(capacity):
+    """Returns the size in bytes of a table with the given capacity"""
+    return 8 * (HEADER_SIZE + ZTABLE_SIZE) + 17 * capacity
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+class ValueTable(MutableMapping):
+    """A Zobrist hash -> value mapping stored in a memory buffer.
+       It can be used as the 'values' of a LearnerPlayer"""
+
+    # --------------------------------------------------------------
+    def __init__(self, buffer):
+        """ValueTable class constructor. Maps the table arrays on
+            the given buffer, that shall contain an initialized table"""
+        self._header = np.ndarray((HEADER_SIZE,), dtype=np.int64, buffer=buffer)
+        if self._header[HEADER_MAGIC] != TABLE_MAGIC:
+            raise ValueError("the buffer does not contain a value table")
+        capacity = int(self._header[HEADER_CAPACITY])
+        offset = 8 * HEADER_SIZE
+        self.ztable = np.ndarray(ZTABLE_SHAPE, dtype=np.int64, buffer=buffer, offset=offset)
+        offset += 8 * ZTABLE_SIZE
+        self._keys = np.ndarray((capacity,), dtype=np.int64, buffer=buffer, offset=offset)
+        offset += 8 * capacity
+        self._values = np.ndarray((capacity,), dtype=np.float64, buffer=buffer, offset=offset)
+        offset += 8 * capacity
+        self._used = np.ndarray((capacity,), dtype=np.uint8, buffer=buffer, offset=offset)
+        self._mask = capacity - 1
+
+    # --------------------------------------------------------------
+    @staticmethod
+    def initialize(buffer, capacity, ztable, init_values):
+        """Writes an empty table with the given Zobrist table in the
+            buffer, then fills it with init_values"""
+        if capacity & (capacity - 1):
+            raise ValueError("the capacity shall be a power of two")
+        header = np.ndarray((HEADER_SIZE,), dtype=np.int64, buffer=buffer)
+        header[HEADER_CAPACITY] = capacity
+        header[HEADER_COUNT] = 0
+        header[HEADER_MAGIC] = TABLE_MAGIC
+        table = ValueTable(buffer)
+        table.ztable[:] = ztable
+        table._used[:] = 0
+        table.update(init_values)
+        table.release()
+
+    # --------------------------------------------------------------
+    def _lock(self):
+        """Context manager held while writing the table"""
+        return nullcontext()
+
+    # --------------------------------------------------------------
+    def _find_slot(self, zhash):
+        """Returns the slot of the given hash, or the free slot where
+            it shall be inserted"""
+        slot = zhash & self._mask
+        while self._used[slot] and self._keys[slot] != zhash:
+            slot = (slot + 1) & self._mask
+        return slot
+
+    # --------------------------------------------------------------
+    def __getitem__(self, zhash):
+        slot = self._find_slot(int(zhash))
+        if not self._used[slot]:
+            raise KeyError(zhash)
+        return float(self._values[slot])
+
+    # --------------------------------------------------------------
+    def __contains__(self, zhash):
+        return bool(self._used[self._find_slot(int(zhash))])
+
+    # --------------------------------------------------------------
+    def __setitem__(self, zhash, value):
+        zhash = int(zhash)
+        with self._lock():
+            slot = self._find_slot(zhash)
+            if self._used[slot]:
+                self._values[slot] = value
+                return
+            if self._header[HEADER_COUNT] >= self._mask:
+                raise RuntimeError("the value table is full")
+            self._keys[slot] = zhash
+            self._values[slot] = value
+            self._used[slot] = 1
+            self._header[HEADER_COUNT] += 1
+
+    # --------------------------------------------------------------
+    def __delitem__(self, zhash):
+        raise TypeError("ValueTable does not support deletion")
+
+    # --------------------------------------------------------------
+    def __iter__(self):
+        for slot in np.flatnonzero(self._used):
+            yield int(self._keys[slot])
+
+    # --------------------------------------------------------------
+    def __len__(self):
+        return int(self._header[HEADER_COUNT])
+
+    # --------------------------------------------------------------
+    def release(self):
+        """Drops the references to the buffer"""
+        self._header = self.ztable = self._keys = self._values = self._used = None
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def save_value_table(filename, ztable, values, capacity=DEFAULT_CAPACITY):
+    """Saves the Zobrist table and the values in a prepared model file"""
+    buffer = bytearray(table_size(capacity))
+    ValueTable.initialize(buffer, capacity, ztable, values)
+    with open(filename, "wb") as mfile:
+        mfile.write(buffer)
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def is_value_table_file(filename):
+    """Returns True if the file is a prepared model file"""
+    with open(filename, "rb") as mfile:
+        header = mfile.read(8)
+    return len(header) == 8 and int.from_bytes(header, "little", signed=True) == TABLE_MAGIC
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def load_value_table(filename):
+    """Maps a prepared model file in memory and returns its table.
+       The file is mapped copy on write: the changes made to the table
+       are not written back to the file"""
+    with open(filename, "rb") as mfile:
+        return ValueTable(mmap.mmap(mfile.fileno(), 0, access=mmap.ACCESS_COPY))
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+class SharedValueTable(ValueTable):
+    """A ValueTable stored in a named shared memory segment.
+       Every attached process holds a shared lock on an "attached"
+       file, that the OS releases when the process exits, even if
+       killed: the last process that closes the table destroys the
+       segment, and a segment found without attached processes (left
+       by processes killed before closing it) is destroyed and
+       created again. The segment can also be removed by hand, when
+       no process is using it, deleting /dev/shm/<name>.
+       The lock files are deleted with the segment by the last process
+       that closes the table: a process that was waiting for the write
+       lock meanwhile finds them deleted and opens them again"""
+
+    # --------------------------------------------------------------
+    def __init__(self, name, ztable=None, init_values=None, capacity=DEFAULT_CAPACITY):
+        """SharedValueTable class constructor. Attaches to the segment
+            with the given name. If the segment does not exist it is
+            created with the given Zobrist table and initial values,
+            if a Zobrist table is given, otherwise FileNotFoundError
+            is raised"""
+        self._shm = None
+        self.__unlink_unregisters = False
+        self.__lockpath = os.path.join(tempfile.gettempdir(), name + ".lock")
+        self.__attachpath = os.path.join(tempfile.gettempdir(), name + ".attached")
+        self.__lock_current_files()
+        try:
+            try:
+                self._shm = self.__open_segment(name, False, 0)
+            except FileNotFoundError:
+                pass
+            if self._shm is not None and self.__nobody_attached():
+                self.__destroy_segment()
+            if self._shm is None and ztable is not None:
+                self._shm = self.__open_segment(name, True, table_size(capacity))
+                ValueTable.initialize(self._shm.buf, capacity, ztable, init_values or {})
+            if self._shm is not None:
+                ValueTable.__init__(self, self._shm.buf)
+                fcntl.flock(self._attachfile, fcntl.LOCK_SH)
+            elif self.__nobody_attached():
+                self.__remove_lock_files()
+        finally:
+            fcntl.flock(self._lockfile, fcntl.LOCK_UN)
+        if self._shm is None:
+            self._lockfile.close()
+            self._attachfile.close()
+            raise FileNotFoundError("shared value table %r does not exist" % (name,))
+
+    # --------------------------------------------------------------
+    def __lock_current_files(self):
+        """Opens the lock files and takes the write lock. If the files
+            have been deleted while waiting for the lock, they are
+            opened again"""
+        while True:
+            self._lockfile = open(self.__lockpath, "a")
+            self._attachfile = open(self.__attachpath, "a")
+            fcntl.flock(self._lockfile, fcntl.LOCK_EX)
+            try:
+                if os.path.samestat(os.fstat(self._lockfile.fileno()),
+                                    os.stat(self.__lockpath)) and \
+                   os.path.samestat(os.fstat(self._attachfile.fileno()),
+                                    os.stat(self.__attachpath)):
+                    return
+            except FileNotFoundError:
+                pass
+            self._lockfile.close()
+            self._attachfile.close()
+
+    # --------------------------------------------------------------
+    def __remove_lock_files(self):
+        """Deletes the lock files. Shall be called holding the write
+            lock, when no process is attached"""
+        os.remove(self.__attachpath)
+        os.remove(self.__lockpath)
+
+    # --------------------------------------------------------------
+    def __open_segment(self, name, create, size):
+        """Opens the shared memory segment, without registering it in
+            the resource tracker: the segment shall survive the exit
+            of the process that created it"""
+        try:
+            return shared_memory.SharedMemory(name, create, size, track=False)
+        except TypeError:
+            # python < 3.13 always registers the segment, and
+            # unregisters it when unlinked
+            shm = shared_memory.SharedMemory(name, create, size)
+            resource_tracker.unregister(shm._name, "shared_memory") # pylint: disable=protected-access
+            self.__unlink_unregisters = True
+            return shm
+
+    # --------------------------------------------------------------
+    def __destroy_segment(self):
+        """Closes and unlinks the shared memory segment"""
+        self._shm.close()
+        if self.__unlink_unregisters:
+            resource_tracker.register(self._shm._name, "shared_memory") # pylint: disable=protected-access
+        self._shm.unlink()
+        self._shm = None
+
+    # --------------------------------------------------------------
+    def __nobody_attached(self):
+        """Returns True if no process holds the attached lock. Shall be
+            called holding the write lock, without the attached lock"""
+        try:
+            fcntl.flock(self._attachfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        fcntl.flock(self._attachfile, fcntl.LOCK_UN)
+        return True
+
+    # --------------------------------------------------------------
+    @contextmanager
+    def _lock(self):
+        fcntl.flock(self._lockfile, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lockfile, fcntl.LOCK_UN)
+
+    # --------------------------------------------------------------
+    def close(self):
+        """Detaches from the segment, destroying it if this is the
+            last attached process"""
+        if self._shm is None:
+            return
+        with self._lock():
+            self.release()
+            fcntl.flock(self._attachfile, fcntl.LOCK_UN)
+            if self.__nobody_attached():
+                self.__destroy_segment()
+                self.__remove_lock_files()
+            else:
+                self._shm.close()
+                self._shm = None
+        self._lockfile.close()
+        self._attachfile.close()
@@ -0,0 +1,85 @@
+#
+"""End of game learning with TD(lambda) eligibility traces.
+   The learner player only learns from the final position when it
+   loses. A TDLambdaTrainer records the positions reached after every
+   move of its learner and, at the end of every game (win, draw or
+   loss), propagates the reward back along the whole trajectory:
+       V(s_t) = V(s_t) + alpha * sum_k>=t lambda^(k-t) * delta_k
+       delta_k = V(s_k+1) - V(s_k),  V(s_T) = reward
+   All the updates of a game are computed in a single backward pass
+   over the trajectory. The module does not import numpy: the
+   trajectories are at most 5 positions long, and building numpy arrays
+   for them costs more than the update itself"""
+
+from argparse import ArgumentTypeError
+
+WIN_REWARD = 1.0
+DRAW_REWARD = 0.5
+LOSS_REWARD = 0.0
+UNKNOWN_VALUE = 0.5
+DEFAULT_LAMBDA_VALUE = 0.8
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def lambda_value(_x):
+    """Definition of argument type for TD(lambda) lambda value,
+       a float number in the range [0.0, 1.0]"""
+    try:
+        lam = float(_x)
+    except ValueError:
+        raise ArgumentTypeError("%r not a floating point literal" % (_x,))
+
+    if lam < 0.0 or lam > 1.0:
+        raise ArgumentTypeError("%r not in range [0.0, 1.0]" % (lam,))
+    return lam
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+def td_lambda_update(values, trajectory, reward, alpha, lam):
+    """Updates the values of the positions in the trajectory given the
+       final reward, with the offline (lambda-return) TD(lambda) rule"""
+    if not trajectory:
+        return
+    old_values = [values.get(zhash, UNKNOWN_VALUE) for zhash in trajectory]
+    next_values = old_values[1:] + [reward]
+    # error of step t = delta_t + lambda * error of step t+1
+    error = 0.0
+    for step in range(len(trajectory) - 1, -1, -1):
+        error = next_values[step] - old_values[step] + lam * error
+        values[trajectory[step]] = old_values[step] + alpha * error
+
+# --------------------------------------------------------------------
+# --------------------------------------------------------------------
+class TDLambdaTrainer:
+    """Records the trajectory of a learner player during a game and
+       updates its values from the outcome of the game"""
+
+    # --------------------------------------------------------------
+    def __init__(self, player, alpha, lam=DEFAULT_LAMBDA_VALUE):
+        """TDLambdaTrainer class constructor. Save the learner player
+            and the learning parameters"""
+        self.player = player
+        self.alpha = alpha
+        self.lam = lam
+        self.trajectory = []
+
+    # --------------------------------------------------------------
+    def record(self, zhash):
+        """Records the position reached after a move of the learner"""
+        self.trajectory.append(zhash)
+
+    # --------------------------------------------------------------
+    def learn_from_outcome(self, board):
+        """Updates the values of the trajectory given the final board,
+            and starts a new trajectory"""
+        zhash, score = board.evaluate(self.player.piece)
+        if score > 0:
+            reward = WIN_REWARD
+        elif score < 0:
+            reward = LOSS_REWARD
+        else:
+            reward = DRAW_REWARD
+        self.player.values[zhash] = reward
+        trajectory = [step for step in self.trajectory if step != zhash]
+        td_lambda_update(self.player.values, trajectory, reward, self.alpha, self.lam)
+        self.trajectory = []